@@ -1,7 +1,4 @@
-from src.collector.k8s_data_collector import KubeLogFetcher
-from src.platform.azure.upload.azure_connector import AzureConnector
-from src.platform.azure.collect.aks_addon_status import AksAddonLister
-from src.platform.azure.create.create_env import AzureLogPipelineProvisioner
+from src.collector.sources import SOURCES, MONITORING_ADDON_SOURCES
 from src.utils.load_config import parse_args
 
 from dotenv import load_dotenv
@@ -13,6 +10,11 @@ def main():
 
     user_settings = parse_args()
 
+    if user_settings["command"] == "list-sources":
+        for name, source in SOURCES.items():
+            print(f"{name:<18}{source['table']:<22}{source['description']}")
+        return
+
     load_dotenv()
 
     logging.config.fileConfig('logger.conf', disable_existing_loggers=False)
@@ -30,6 +32,28 @@ def main():
     resource_group = os.getenv("RESOURCE_GROUP_NAME")
     cluster_name = os.getenv("CLUSTER_NAME")
 
+    # The Kubernetes and Azure SDKs are slow to import, only load them once a collection actually runs
+    from src.collector.k8s_data_collector import KubeLogFetcher
+    from src.platform.azure.upload.azure_connector import AzureConnector
+    from src.platform.azure.create.create_env import AzureLogPipelineProvisioner
+    from src.utils.memory_budget import MemoryBudget
+
+    sources = user_settings.get("sources", list(SOURCES))
+
+    if any(source in MONITORING_ADDON_SOURCES for source in sources):
+        from src.platform.azure.collect.aks_addon_status import AksAddonLister
+
+        aks_addon_lister = AksAddonLister(subscription_id, resource_group)
+
+        # Check whether the monitoring addon is installed and enabled. If so, no need to manually collect as this is already done
+        if aks_addon_lister.get_enabled_addon_for_cluster(cluster_name, "omsagent"):
+            logger.info(f"Monitoring addon is enabled, skipping sources: {MONITORING_ADDON_SOURCES}")
+            sources = [source for source in sources if source not in MONITORING_ADDON_SOURCES]
+
+    if not sources:
+        logger.info("No sources left to collect")
+        return
+
     provisioner = AzureLogPipelineProvisioner(
         subscription_id=subscription_id,
         resource_group=resource_group,
@@ -38,40 +62,32 @@ def main():
         dce_name=user_settings.get("dce_name", "Kube-DCE"),
     )
 
-    # Setup Azure environment
-    result = provisioner.run()
+    # Setup Azure environment, only creating the tables and DCRs of the selected sources
+    result = provisioner.run(table_names=[SOURCES[source]["table"] for source in sources])
 
-    connector = AzureConnector(endpoint_uri=result["dce_endpoint"])
+    # Shared by the collectors and the uploader, so every buffered record counts against the same limit
+    memory_budget = MemoryBudget(user_settings.get("max_memory"))
 
-    aks_addon_lister = AksAddonLister(subscription_id, resource_group)
-
-    # Check whether the monitoring addon is installed and enabled. If so, no need to manually collect as this is already done
-    monitoring_enabled = aks_addon_lister.get_enabled_addon_for_cluster(cluster_name, "omsagent")
+    connector = AzureConnector(
+        endpoint_uri=result["dce_endpoint"],
+        serialization_workers=user_settings.get("serialization_workers"),
+        memory_budget=memory_budget,
+    )
 
     dcr_mappings = result["dcr_mappings"]
 
-    fetcher = KubeLogFetcher(user_settings)
-
-    data_sources = {
-        "kubelogs_CL": fetcher.retrieve_logs_from_pods,
-        "kubeevents_CL": fetcher.retrieve_events,
-        "commandhistory_CL": fetcher.retrieve_command_history,
-        "serviceaccounts_CL": fetcher.get_service_accounts,
-        "suspiciouspods_CL": fetcher.get_suspicious_pods,
-        "rbacbindings_CL": fetcher.get_rbac_bindings,
-        "cronjobs_CL": fetcher.get_cronjob_containers_info,
-        "networkpolicies_CL": fetcher.get_network_policies
-    }
-
-    for table_name, fetch_function in data_sources.items():
-        if monitoring_enabled and table_name in ["kubelogs_CL", "kubeevents_CL"]:
-            continue  # Skip if monitoring is enabled
- 
-        connector.upload_in_batches(
-            generator_function=fetch_function,
-            stream_name=f"Custom-{table_name}",
-            dcr_stream_id=dcr_mappings[table_name]["dcr_id"]
-        )
+    fetcher = KubeLogFetcher(user_settings, memory_budget=memory_budget)
+
+    try:
+        for source in sources:
+            table_name = SOURCES[source]["table"]
+            connector.upload_in_batches(
+                generator_function=getattr(fetcher, SOURCES[source]["collector"]),
+                stream_name=f"Custom-{table_name}",
+                dcr_stream_id=dcr_mappings[table_name]["dcr_id"]
+            )
+    finally:
+        connector.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,7 @@
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
+from src.collector.rbac_index import RbacIndex
+from src.utils.record_batch import RecordBuffer
 from pathlib import Path
 import os
 import subprocess
@@ -9,21 +11,30 @@ import tempfile
 import logging
 
 class KubeLogFetcher:
-    def __init__(self, user_settings):
+    def __init__(self, user_settings, memory_budget=None):
         self.logger = logging.getLogger("kubeLogger")
+        configuration = client.Configuration()
         try:
-            config.load_kube_config()
+            config.load_kube_config(client_configuration=configuration)
             self.logger.info("Loaded kubeconfig successfully.")
         except Exception as e:
             self.logger.error(f"Failed to load kubeconfig: {e}")
             raise
-        self.v1 = client.CoreV1Api()
+        # One API client, and so one connection pool, is shared by all Kubernetes APIs.
+        # Calls are made one after another, so a small pool of kept-alive connections suffices.
+        configuration.connection_pool_maxsize = 10
+        self.api_client = client.ApiClient(configuration)
+        self.v1 = client.CoreV1Api(self.api_client)
         self.since_seconds = user_settings.get("since_seconds", 86400)
         self.namespaces_to_skip = ["kube-system", "azure-arc", "gatekeeper-system"]
         self.pod_batch_size = 500
-        self.rbac_v1 = client.RbacAuthorizationV1Api()
-        self.batch_v1 = client.BatchV1Api()
-        self.networking_v1 = client.NetworkingV1Api()
+        self.record_batch_size = 500
+        self.columnar = user_settings.get("columnar", False)
+        self.memory_budget = memory_budget
+        self.rbac_v1 = client.RbacAuthorizationV1Api(self.api_client)
+        self.batch_v1 = client.BatchV1Api(self.api_client)
+        self.networking_v1 = client.NetworkingV1Api(self.api_client)
+        self.rbac_index = None
     
     def is_pod_valid(self, pod):
         return pod.status.phase != "Succeeded" and pod.metadata.namespace not in self.namespaces_to_skip
@@ -42,7 +53,11 @@ class KubeLogFetcher:
         except ApiException as e:
             self.logger.error(f"Error fetching pods: {e}")
 
+    def new_record_buffer(self, table_name):
+        return RecordBuffer(table_name, columnar=self.columnar, batch_size=self.record_batch_size, memory_budget=self.memory_budget)
+
     def retrieve_logs_from_pods(self):
+        records = self.new_record_buffer("kubelogs_CL")
         for pod in self.get_pods_stream():
             try:
                 if not pod.status.container_statuses:
@@ -51,6 +66,7 @@ class KubeLogFetcher:
 
                 for container_status in pod.status.container_statuses:
                     container_name = container_status.name
+                    images = [c.image for c in pod.spec.containers]
 
                     # Determine if we should collect previous logs based on whether the container restarted
                     log_modes = [("current", False)]
@@ -78,22 +94,24 @@ class KubeLogFetcher:
                             for raw_line in log_response:
                                 line = raw_line.decode("utf-8")
                                 timestamp, message = line.split(" ", maxsplit=1)
-                                yield {
-                                    "TimeGenerated": timestamp,
-                                    "message": message,
-                                    "container_name": container_name,
-                                    "namespace": pod.metadata.namespace,
-                                    "pod_name": pod.metadata.name,
-                                    "images": [c.image for c in pod.spec.containers],
-                                    "labels": pod.metadata.labels,
-                                    "annotations": pod.metadata.annotations,
-                                }
+                                yield from records.add(
+                                    timestamp,
+                                    message,
+                                    container_name,
+                                    pod.metadata.namespace,
+                                    pod.metadata.name,
+                                    images,
+                                    pod.metadata.labels,
+                                    pod.metadata.annotations
+                                )
 
                         except ApiException as e:
                             self.logger.error(f"Could not get {label} logs for {container_name}: {e}")
 
             except ApiException as e:
                 self.logger.error(f"Error accessing pod '{pod.metadata.name}': {e}")
+
+        yield from records.flush()
     
     def format_timestamp(self, timestamp):
         # Format from datetime object to plain string, since a datetime is not serializable
@@ -101,8 +119,8 @@ class KubeLogFetcher:
 
     def retrieve_events(self):
         self.logger.info("Fetching events for all namespaces")
-        data = self.v1.list_event_for_all_namespaces().items
-        for event in data:
+        # Events are paged, so only one page is held in memory at a time
+        for event in self.list_all(self.v1.list_event_for_all_namespaces):
             yield {
                 "TimeGenerated": self.format_timestamp(event.metadata.creation_timestamp),
                 "first_timestamp": self.format_timestamp(event.first_timestamp),
@@ -122,6 +140,7 @@ class KubeLogFetcher:
         "/root/.bash_history"
         ]
         self.logger.info("Retrieving command history")
+        records = self.new_record_buffer("commandhistory_CL")
         for pod in self.get_pods_stream():
 
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -142,32 +161,32 @@ class KubeLogFetcher:
                                 for line in f:
                                     line = line.strip()
                                     if line:
-                                        yield {
-                                            "TimeGenerated": datetime.utcnow().isoformat(),
-                                            "namespace": pod.metadata.namespace,
-                                            "pod_name": pod.metadata.name,
-                                            "container_name": container.name,
-                                            "command": line
-                                        }
+                                        yield from records.add(
+                                            datetime.utcnow().isoformat(),
+                                            pod.metadata.namespace,
+                                            pod.metadata.name,
+                                            container.name,
+                                            line
+                                        )
 
                         except subprocess.CalledProcessError:
                             self.logger.error(f"Failed to copy {history_path} from {pod.metadata.name}/{container.name}")
                         except FileNotFoundError:
                             continue
+
+        yield from records.flush()
     
     def get_service_accounts(self):
         self.logger.info("Retrieving service accounts")
-        for ns in self.v1.list_namespace().items:
-            namespace = ns.metadata.name
-            for sa in self.v1.list_namespaced_service_account(namespace).items:
-                creation_timestamp = self.format_timestamp(sa.metadata.creation_timestamp)
-                yield {
-                    "TimeGenerated": creation_timestamp,
-                    "namespace": namespace,
-                    "name": sa.metadata.name,
-                    "automount_service_account_token": sa.automount_service_account_token,
-                    "image_pull_secrets": sa.image_pull_secrets
-                }
+        for sa in self.list_all(self.v1.list_service_account_for_all_namespaces):
+            creation_timestamp = self.format_timestamp(sa.metadata.creation_timestamp)
+            yield {
+                "TimeGenerated": creation_timestamp,
+                "namespace": sa.metadata.namespace,
+                "name": sa.metadata.name,
+                "automount_service_account_token": sa.automount_service_account_token,
+                "image_pull_secrets": sa.image_pull_secrets
+            }
     
     def get_suspicious_pods(self):
         self.logger.info("Retrieving possibly suspicious pods")
@@ -214,51 +233,71 @@ class KubeLogFetcher:
                         "details": f"hostPath: {volume.host_path.path}, type: {vol_type}"
                     }
 
+    def list_all(self, list_function, **kwargs):
+        # Page through a list call so large clusters are not fetched in a single response
+        response = list_function(limit=self.pod_batch_size, **kwargs)
+        while True:
+            yield from response.items
+            if not response.metadata._continue:
+                break
+            response = list_function(limit=self.pod_batch_size, _continue=response.metadata._continue, **kwargs)
+
+    def get_rbac_index(self):
+        # Roles and bindings are fetched once and shared by all RBAC collectors
+        if self.rbac_index is None:
+            self.logger.info("Fetching roles, cluster roles, their bindings and service accounts")
+            self.rbac_index = RbacIndex(
+                roles=list(self.list_all(self.rbac_v1.list_role_for_all_namespaces)),
+                cluster_roles=list(self.list_all(self.rbac_v1.list_cluster_role)),
+                role_bindings=list(self.list_all(self.rbac_v1.list_role_binding_for_all_namespaces)),
+                cluster_role_bindings=list(self.list_all(self.rbac_v1.list_cluster_role_binding)),
+                service_accounts=list(self.list_all(self.v1.list_service_account_for_all_namespaces))
+            )
+        return self.rbac_index
+
     def get_rbac_bindings(self):
         self.logger.info("Retrieving RBAC bindings")
-        for binding in self.rbac_v1.list_role_binding_for_all_namespaces().items:
-            creation_timestamp = self.format_timestamp(binding.metadata.creation_timestamp)
-            binding_name = binding.metadata.name
-            namespace = binding.metadata.namespace
-            role_ref_kind = binding.role_ref.kind
-            role_ref_name = binding.role_ref.name
-
-            for subject in binding.subjects or []:
+        rbac_index = self.get_rbac_index()
+        for (subject_kind, subject_name, subject_namespace), grants in rbac_index.bindings_by_subject.items():
+            for grant in grants:
                 yield {
-                    "TimeGenerated": creation_timestamp,
-                    "binding_type": "RoleBinding",
-                    "binding_name": binding_name,
-                    "namespace": namespace,
-                    "subject_kind": subject.kind,
-                    "subject_name": subject.name,
-                    "subject_namespace": getattr(subject, "namespace", namespace),
-                    "role_ref_kind": role_ref_kind,
-                    "role_ref_name": role_ref_name
+                    "TimeGenerated": self.format_timestamp(grant["creation_timestamp"]),
+                    "binding_type": grant["binding_type"],
+                    "binding_name": grant["binding_name"],
+                    "namespace": grant["namespace"],
+                    "subject_kind": subject_kind,
+                    "subject_name": subject_name,
+                    "subject_namespace": subject_namespace or "",
+                    "role_ref_kind": grant["role_ref_kind"],
+                    "role_ref_name": grant["role_ref_name"]
                 }
-        
-        for binding in self.rbac_v1.list_cluster_role_binding().items:
-            creation_timestamp = self.format_timestamp(binding.metadata.creation_timestamp)
-            binding_name = binding.metadata.name
-            namespace = binding.metadata.namespace
-            role_ref_kind = binding.role_ref.kind
-            role_ref_name = binding.role_ref.name
 
-            for subject in binding.subjects or []:
-                yield {
-                    "TimeGenerated": creation_timestamp,
-                    "binding_type": "RoleBinding",
-                    "binding_name": binding_name,
-                    "namespace": namespace,
-                    "subject_kind": subject.kind,
-                    "subject_name": subject.name,
-                    "subject_namespace": getattr(subject, "namespace", namespace),
-                    "role_ref_kind": role_ref_kind,
-                    "role_ref_name": role_ref_name
-                }
-    
+    def get_rbac_effective_permissions(self):
+        self.logger.info("Resolving effective RBAC permissions")
+        for permission in self.get_rbac_index().effective_permissions():
+            grant = permission["grant"]
+            yield {
+                "TimeGenerated": self.format_timestamp(grant["creation_timestamp"]),
+                "subject_kind": permission["subject_kind"],
+                "subject_name": permission["subject_name"],
+                "subject_namespace": permission["subject_namespace"],
+                "via_group": permission["via_group"],
+                "scope": permission["scope"],
+                "namespace": grant["namespace"] or "",
+                "binding_type": grant["binding_type"],
+                "binding_name": grant["binding_name"],
+                "role_ref_kind": grant["role_ref_kind"],
+                "role_ref_name": grant["role_ref_name"],
+                "api_groups": permission["api_groups"],
+                "resources": permission["resources"],
+                "verbs": permission["verbs"],
+                "resource_names": permission["resource_names"],
+                "non_resource_urls": permission["non_resource_urls"]
+            }
+
     def get_cronjob_containers_info(self):
         self.logger.info("Extracting CronJob container info")
-        for cj in self.batch_v1.list_cron_job_for_all_namespaces().items:
+        for cj in self.list_all(self.batch_v1.list_cron_job_for_all_namespaces):
             creation_timestamp = self.format_timestamp(cj.metadata.creation_timestamp)
             cj_name = cj.metadata.name
             namespace = cj.metadata.namespace
@@ -278,7 +317,7 @@ class KubeLogFetcher:
 
     def get_network_policies(self):
         self.logger.info("Retrieving Network Policies")
-        for np in self.networking_v1.list_network_policy_for_all_namespaces().items:
+        for np in self.list_all(self.networking_v1.list_network_policy_for_all_namespaces):
             creation_timestamp = self.format_timestamp(np.metadata.creation_timestamp)
             yield {
                 "TimeGenerated": creation_timestamp,
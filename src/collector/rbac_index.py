@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+def service_account_groups(namespace):
+    """Groups every service account of the namespace implicitly belongs to."""
+    return ["system:serviceaccounts", f"system:serviceaccounts:{namespace}", "system:authenticated"]
+
+class RbacIndex:
+    """
+    In-memory index over a snapshot of the cluster's RBAC objects.
+
+    Roles, ClusterRoles, RoleBindings and ClusterRoleBindings are fetched once and indexed as
+    subject -> binding -> role -> rules, so effective permissions can be resolved per subject
+    without joining the raw objects again. Aggregated ClusterRoles are resolved through a
+    label index instead of scanning every ClusterRole per selector.
+    """
+
+    def __init__(self, roles, cluster_roles, role_bindings, cluster_role_bindings, service_accounts=()):
+        # (namespace, name) -> rules
+        self.role_rules = {
+            (role.metadata.namespace, role.metadata.name): list(role.rules or [])
+            for role in roles
+        }
+        self.cluster_roles = {cr.metadata.name: cr for cr in cluster_roles}
+
+        # (label key, label value) -> names of ClusterRoles carrying that label
+        self.cluster_roles_by_label = defaultdict(set)
+        for cr in cluster_roles:
+            for key, value in (cr.metadata.labels or {}).items():
+                self.cluster_roles_by_label[(key, value)].add(cr.metadata.name)
+
+        self.cluster_role_rules = {}
+        for name in self.cluster_roles:
+            self.cluster_role_rules[name] = self.resolve_cluster_role_rules(name)
+
+        # (subject kind, subject name, subject namespace) -> list of bindings granting roles to it
+        self.bindings_by_subject = defaultdict(list)
+        for binding in role_bindings:
+            self.index_binding(binding, "RoleBinding")
+        for binding in cluster_role_bindings:
+            self.index_binding(binding, "ClusterRoleBinding")
+
+        # (namespace, name) of every known service account, including those only named in bindings
+        self.service_accounts = {(sa.metadata.namespace, sa.metadata.name) for sa in service_accounts}
+        self.service_accounts |= {
+            (namespace, name) for kind, name, namespace in self.bindings_by_subject if kind == "ServiceAccount"
+        }
+
+    def index_binding(self, binding, binding_type):
+        namespace = binding.metadata.namespace
+        grant = {
+            "binding_type": binding_type,
+            "binding_name": binding.metadata.name,
+            "namespace": namespace,
+            "creation_timestamp": binding.metadata.creation_timestamp,
+            "role_ref_kind": binding.role_ref.kind,
+            "role_ref_name": binding.role_ref.name,
+        }
+        for subject in binding.subjects or []:
+            # Only service accounts are namespaced subjects, users and groups are cluster-wide
+            subject_namespace = (subject.namespace or namespace) if subject.kind == "ServiceAccount" else None
+            self.bindings_by_subject[(subject.kind, subject.name, subject_namespace)].append(grant)
+
+    def resolve_cluster_role_rules(self, name, seen=None):
+        """Return the rules of a ClusterRole, including those of the ClusterRoles it aggregates."""
+        if name in self.cluster_role_rules:
+            return self.cluster_role_rules[name]
+
+        cluster_role = self.cluster_roles.get(name)
+        if cluster_role is None:
+            return []
+
+        seen = (seen or set()) | {name}
+        rules = list(cluster_role.rules or [])
+        aggregation_rule = cluster_role.aggregation_rule
+        if aggregation_rule:
+            for selector in aggregation_rule.cluster_role_selectors or []:
+                for member in sorted(self.match_cluster_roles(selector) - seen):
+                    for rule in self.resolve_cluster_role_rules(member, seen):
+                        # The aggregation controller usually already copied these rules over
+                        if rule not in rules:
+                            rules.append(rule)
+        return rules
+
+    def match_cluster_roles(self, selector):
+        candidates = None
+        for key, value in (selector.match_labels or {}).items():
+            matched = self.cluster_roles_by_label.get((key, value), set())
+            candidates = matched if candidates is None else candidates & matched
+
+        if candidates is None:
+            candidates = set(self.cluster_roles)
+
+        for expression in selector.match_expressions or []:
+            candidates = {name for name in candidates if self.matches_expression(name, expression)}
+        return candidates
+
+    def matches_expression(self, cluster_role_name, expression):
+        labels = self.cluster_roles[cluster_role_name].metadata.labels or {}
+        operator = expression.operator
+        if operator == "In":
+            return labels.get(expression.key) in (expression.values or [])
+        if operator == "NotIn":
+            return labels.get(expression.key) not in (expression.values or [])
+        if operator == "Exists":
+            return expression.key in labels
+        if operator == "DoesNotExist":
+            return expression.key not in labels
+        return False
+
+    def rules_for_grant(self, grant):
+        if grant["role_ref_kind"] == "ClusterRole":
+            return self.cluster_role_rules.get(grant["role_ref_name"], [])
+        return self.role_rules.get((grant["namespace"], grant["role_ref_name"]), [])
+
+    def effective_permissions(self):
+        """
+        Yield one entry per subject, binding and rule, holding the resolved permission.
+
+        Service accounts also get the rules granted to the groups they implicitly belong to,
+        with via_group set to the group the rule was inherited from.
+        """
+        for (subject_kind, subject_name, subject_namespace), grants in self.bindings_by_subject.items():
+            for grant in grants:
+                yield from self.grant_permissions(subject_kind, subject_name, subject_namespace, grant)
+
+        for namespace, name in sorted(self.service_accounts):
+            for group in service_account_groups(namespace):
+                for grant in self.bindings_by_subject.get(("Group", group, None), []):
+                    yield from self.grant_permissions("ServiceAccount", name, namespace, grant, via_group=group)
+
+    def grant_permissions(self, subject_kind, subject_name, subject_namespace, grant, via_group=""):
+        # A ClusterRoleBinding grants the role cluster-wide, a RoleBinding only in its namespace
+        scope = "Cluster" if grant["binding_type"] == "ClusterRoleBinding" else "Namespace"
+        for rule in self.rules_for_grant(grant):
+            yield {
+                "subject_kind": subject_kind,
+                "subject_name": subject_name,
+                "subject_namespace": subject_namespace or "",
+                "via_group": via_group,
+                "scope": scope,
+                "grant": grant,
+                "api_groups": list(rule.api_groups or []),
+                "resources": list(rule.resources or []),
+                "verbs": list(rule.verbs or []),
+                "resource_names": list(rule.resource_names or []),
+                "non_resource_urls": list(rule.non_resource_ur_ls or []),
+            }
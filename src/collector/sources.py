@@ -0,0 +1,52 @@
+# Data sources which can be collected, keyed by the name used on the command line.
+# Kept free of SDK imports, so listing and validating sources does not load the Kubernetes or Azure libraries.
+SOURCES = {
+    "logs": {
+        "table": "kubelogs_CL",
+        "collector": "retrieve_logs_from_pods",
+        "description": "Logs which are produced by containers"
+    },
+    "events": {
+        "table": "kubeevents_CL",
+        "collector": "retrieve_events",
+        "description": "Kubernetes events of all namespaces"
+    },
+    "commandhistory": {
+        "table": "commandhistory_CL",
+        "collector": "retrieve_command_history",
+        "description": "Commands logged in /root/.ash_history or /root/.bash_history"
+    },
+    "serviceaccounts": {
+        "table": "serviceaccounts_CL",
+        "collector": "get_service_accounts",
+        "description": "Service accounts of all namespaces"
+    },
+    "suspiciouspods": {
+        "table": "suspiciouspods_CL",
+        "collector": "get_suspicious_pods",
+        "description": "Pods on the host network, privileged or mounting a host path"
+    },
+    "rbacbindings": {
+        "table": "rbacbindings_CL",
+        "collector": "get_rbac_bindings",
+        "description": "RoleBindings and ClusterRoleBindings per subject"
+    },
+    "rbacpermissions": {
+        "table": "rbacpermissions_CL",
+        "collector": "get_rbac_effective_permissions",
+        "description": "Effective RBAC permissions per subject"
+    },
+    "cronjobs": {
+        "table": "cronjobs_CL",
+        "collector": "get_cronjob_containers_info",
+        "description": "Containers run by CronJobs"
+    },
+    "networkpolicies": {
+        "table": "networkpolicies_CL",
+        "collector": "get_network_policies",
+        "description": "Network policies of all namespaces"
+    }
+}
+
+# Sources which the AKS monitoring addon already collects when it is enabled
+MONITORING_ADDON_SOURCES = ["logs", "events"]
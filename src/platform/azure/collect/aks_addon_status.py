@@ -1,6 +1,7 @@
-from azure.identity import DefaultAzureCredential
 from azure.mgmt.containerservice import ContainerServiceClient
 
+from src.utils.transport import get_azure_transport, get_credential
+
 class AksAddonLister:
     def __init__(self, subscription_id, resource_group):
         self.subscription_id = subscription_id
@@ -8,8 +9,8 @@ class AksAddonLister:
         self.authenticate()
 
     def authenticate(self):
-        credential = DefaultAzureCredential()
-        self.client = ContainerServiceClient(credential, self.subscription_id)
+        credential = get_credential()
+        self.client = ContainerServiceClient(credential, self.subscription_id, transport=get_azure_transport())
 
     def get_addons_for_cluster(self, cluster_name):
         cluster = self.client.managed_clusters.get(self.resource_group, cluster_name)
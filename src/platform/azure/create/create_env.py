@@ -1,17 +1,17 @@
-import requests
 import json
 import time
 import logging
 import sys
 from collections import defaultdict
 
-from azure.identity import DefaultAzureCredential
 from azure.mgmt.loganalytics import LogAnalyticsManagementClient
 from azure.core.exceptions import HttpResponseError
 
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 from src.utils.retry_logging import log_attempt_number
+from src.utils.table_schemas import TABLES
+from src.utils.transport import BearerTokenAuth, get_azure_transport, get_credential, get_session
 
 class AzureLogPipelineProvisioner:
     TABLE_API_VERSION = "2025-02-01"
@@ -27,14 +27,15 @@ class AzureLogPipelineProvisioner:
         self.logger = logging.getLogger("appLogger")
         self.created_resources = []
 
-        self.credential = DefaultAzureCredential()
-        self.token = self.credential.get_token("https://management.azure.com/.default").token
+        self.credential = get_credential()
+        self.session = get_session()
+        # The token is fetched per request from the shared credential, so it is renewed during long runs
+        self.auth = BearerTokenAuth(self.credential)
         self.headers = {
-            "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
 
-        self.log_analytics_client = LogAnalyticsManagementClient(self.credential, self.subscription_id)
+        self.log_analytics_client = LogAnalyticsManagementClient(self.credential, self.subscription_id, transport=get_azure_transport())
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(5), reraise=True, after=log_attempt_number)
     def create_workspace(self):
@@ -71,7 +72,7 @@ class AzureLogPipelineProvisioner:
                 "retentionInDays": 30
             }
         }
-        resp = requests.put(url, headers=self.headers, data=json.dumps(payload))
+        resp = self.session.put(url, auth=self.auth, headers=self.headers, data=json.dumps(payload))
         resp.raise_for_status()
         self.logger.info(f"[+] Created custom table {table_name} successfully")
         self.created_resources.append({
@@ -91,7 +92,7 @@ class AzureLogPipelineProvisioner:
                 }
             }
         }
-        resp = requests.put(url, headers=self.headers, data=json.dumps(payload))
+        resp = self.session.put(url, auth=self.auth, headers=self.headers, data=json.dumps(payload))
         
         resp.raise_for_status()
         data = resp.json()
@@ -149,7 +150,7 @@ class AzureLogPipelineProvisioner:
         }
 
 
-        dcr_resp = requests.put(dcr_url, headers=self.headers, data=json.dumps(dcr_payload))
+        dcr_resp = self.session.put(dcr_url, auth=self.auth, headers=self.headers, data=json.dumps(dcr_payload))
         dcr_resp.raise_for_status()
         immutable_dcr_id = dcr_resp.json()["properties"]["immutableId"]
         self.logger.info(f"[+] DCR {dcr_name} created successfully.")
@@ -159,7 +160,7 @@ class AzureLogPipelineProvisioner:
         })
         return immutable_dcr_id
 
-    def run(self):
+    def run(self, table_names=None):
         try:
             self.create_workspace()
             self.logger.info("Provisioning LAW for 30s")
@@ -170,98 +171,7 @@ class AzureLogPipelineProvisioner:
                 "dcr_mappings": {}
             }
 
-            tables = [{
-                "name": "kubelogs_CL",
-                "columns" : [
-                    {"name": "TimeGenerated", "type": "DateTime"},
-                    {"name": "message", "type": "String"},
-                    {"name": "container_name", "type": "String"},
-                    {"name": "namespace", "type": "String"},
-                    {"name": "pod_name", "type": "String"},
-                    {"name": "containerimages", "type": "String"},
-                    {"name": "labels", "type": "String"},
-                    {"name": "annotations", "type": "String"},
-                ]
-                },
-                {
-                    "name": "kubeevents_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "action", "type": "String"},
-                        {"name": "first_timestamp", "type": "DateTime"},
-                        {"name": "involved_object_name", "type": "String"},
-                        {"name": "involved_object_uid", "type": "String"},
-                        {"name": "last_timestamp", "type": "DateTime"},
-                        {"name": "message", "type": "String"},
-                        {"name": "reason", "type": "String"},
-                        {"name": "reporting_component", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "commandhistory_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "pod_name", "type": "String"},
-                        {"name": "container_name", "type": "String"},
-                        {"name": "command", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "serviceaccounts_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "name", "type": "String"},
-                        {"name": "automount_service_account_token", "type": "String"},
-                        {"name": "image_pull_secrets", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "suspiciouspods_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "pod_name", "type": "String"},
-                        {"name": "issue_type", "type": "String"},
-                        {"name": "details", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "rbacbindings_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "binding_type", "type": "String"},
-                        {"name": "binding_name", "type": "String"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "subject_kind", "type": "String"},
-                        {"name": "subject_name", "type": "String"},
-                        {"name": "subject_namespace", "type": "String"},
-                        {"name": "role_ref_kind", "type": "String"},
-                        {"name": "role_ref_name", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "cronjobs_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "cronjob_name", "type": "String"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "container_name", "type": "String"},
-                        {"name": "image", "type": "String"},
-                        {"name": "command", "type": "String"},
-                        {"name": "schedule", "type": "String"}
-                    ]
-                },
-                {
-                    "name": "networkpolicies_CL",
-                    "columns": [
-                        {"name": "TimeGenerated", "type": "DateTime"},
-                        {"name": "namespace", "type": "String"},
-                        {"name": "name", "type": "String"}
-                    ]
-                }
-            ]
+            tables = [table for table in TABLES if table_names is None or table["name"] in table_names]
 
             # First create all tables, then a DCR for each table
             for table in tables:
@@ -1,49 +1,127 @@
-from azure.identity import DefaultAzureCredential
 from azure.monitor.ingestion import LogsIngestionClient
 from azure.core.exceptions import HttpResponseError
 
-import math
+from src.platform.azure.upload.payload_builder import build_payloads
+from src.utils.memory_budget import MemoryBudget, estimate_size
+from src.utils.record_batch import ColumnarBatch
+from src.utils.transport import get_azure_transport, get_credential
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
 import logging
 
+# Every worker is a forked copy of the collector, keep the default small whatever the size of the node
+DEFAULT_MAX_SERIALIZATION_WORKERS = 4
+
+def default_serialization_workers():
+    # CPUs this process may run on, which unlike os.cpu_count() respects cpusets of the container
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return min(available, DEFAULT_MAX_SERIALIZATION_WORKERS)
+
 class AzureConnector:
-    def __init__(self, endpoint_uri):
+    def __init__(self, endpoint_uri, serialization_workers=None, memory_budget=None):
         self.setup_envs(endpoint_uri=endpoint_uri)
         self.authenticate()
         self.BATCH_SIZE = 500
         self.logger = logging.getLogger("appLogger")
-    
+        self.serialization_workers = serialization_workers or default_serialization_workers()
+        # Limit the number of batches queued for serialization, so collection cannot run far ahead of the upload
+        self.max_pending_batches = self.serialization_workers * 2
+        self.pool = None
+        if self.serialization_workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.serialization_workers)
+        self.memory_budget = memory_budget or MemoryBudget()
+
     def setup_envs(self, endpoint_uri):
         self.endpoint_uri = endpoint_uri
         if not self.endpoint_uri:
             raise EnvironmentError(f"Required values not set: endpoint_uri: {self.endpoint_uri}")
 
     def authenticate(self):
-        credential = DefaultAzureCredential()
-        self.client = LogsIngestionClient(endpoint=self.endpoint_uri, credential=credential, logging_enabled=True)
+        credential = get_credential()
+        self.client = LogsIngestionClient(endpoint=self.endpoint_uri, credential=credential, logging_enabled=True, transport=get_azure_transport())
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+    def send_payloads(self, payloads, stream_name, dcr_stream_id):
+        # Payloads are already serialized and compressed, only the network call remains.
+        # The SDK recognizes the gzip header of the stream and sets the Content-Encoding itself.
+        counter = 0
+        for record_count, body in payloads:
+            self.client.upload(
+                rule_id=dcr_stream_id,
+                stream_name=stream_name,
+                logs=io.BytesIO(body)
+            )
+            counter += record_count
+        return counter
 
     def upload_in_batches(self, generator_function, stream_name, dcr_stream_id):
         batch = []
+        batch_size = 0
+        # ids of the objects already counted for the open batch, see estimate_size
+        batch_seen = set()
+        pending = deque()
         counter = 0
 
         self.logger.info(f"Uploading to {stream_name}")
 
         for entry in generator_function():
-            batch.append(entry)
-            if len(batch) >= self.BATCH_SIZE:
-                self.client.upload(
-                    rule_id=dcr_stream_id,
-                    stream_name=stream_name,
-                    logs=batch
-                )
-                counter += len(batch)
-                batch.clear()
-
-        # upload last batch which does not exceed batch size
+            if isinstance(entry, ColumnarBatch):
+                # Collectors in columnar mode hand out complete batches, whose rows already reserved their memory.
+                # Backpressure: the collector is not resumed until enough buffered data has been uploaded.
+                while self.memory_budget.exceeded and pending:
+                    counter += self.send_pending(pending.popleft(), stream_name, dcr_stream_id)
+                pending.append(self.submit_batch(entry, entry.reserved))
+            else:
+                size = 0
+                # Estimating is only worth its cost when there is a limit to enforce
+                if self.memory_budget.limited:
+                    size = estimate_size(entry, batch_seen)
+
+                # Backpressure: the collector is not resumed until buffered data has been uploaded and the entry fits the budget
+                while not self.memory_budget.try_acquire(size):
+                    if pending:
+                        counter += self.send_pending(pending.popleft(), stream_name, dcr_stream_id)
+                    elif batch:
+                        pending.append(self.submit_batch(batch, batch_size))
+                        batch, batch_size, batch_seen = [], 0, set()
+                    else:
+                        self.memory_budget.force_acquire(size)
+                        break
+
+                batch.append(entry)
+                batch_size += size
+                if len(batch) >= self.BATCH_SIZE:
+                    pending.append(self.submit_batch(batch, batch_size))
+                    batch, batch_size, batch_seen = [], 0, set()
+            while len(pending) > self.max_pending_batches:
+                counter += self.send_pending(pending.popleft(), stream_name, dcr_stream_id)
+
+        # serialize last batch which does not exceed batch size
         if batch:
-            self.client.upload(
-                rule_id=dcr_stream_id,
-                stream_name=stream_name,
-                logs=batch
-            )
-            counter += len(batch)
-        self.logger.info(f"Total entries uploaded: {counter} to {stream_name}")
\ No newline at end of file
+            pending.append(self.submit_batch(batch, batch_size))
+
+        while pending:
+            counter += self.send_pending(pending.popleft(), stream_name, dcr_stream_id)
+        self.logger.info(f"Total entries uploaded: {counter} to {stream_name}")
+        self.logger.debug(f"Peak buffered memory: {self.memory_budget.peak} bytes")
+
+    def submit_batch(self, batch, size):
+        if self.pool:
+            return self.pool.submit(build_payloads, batch), size
+        return build_payloads(batch), size
+
+    def send_pending(self, pending_batch, stream_name, dcr_stream_id):
+        payloads, size = pending_batch
+        if self.pool:
+            payloads = payloads.result()
+        try:
+            return self.send_payloads(payloads, stream_name, dcr_stream_id)
+        finally:
+            self.memory_budget.release(size)
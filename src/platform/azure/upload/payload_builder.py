@@ -0,0 +1,69 @@
+import gzip
+import json
+
+from src.utils.record_batch import ColumnarBatch
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The Logs Ingestion API rejects requests whose uncompressed body exceeds 1MB
+MAX_PAYLOAD_BYTES = 1024 * 1024
+
+def encode_record(record):
+    # Values such as Kubernetes model objects are not JSON serializable, store their string form instead
+    if orjson:
+        return orjson.dumps(record, default=str)
+    return json.dumps(record, default=str, separators=(",", ":")).encode("utf-8")
+
+def encode_column(values):
+    # Rows of the same pod share objects such as labels, encode those only once
+    encoded = []
+    previous = previous_encoded = None
+    for value in values:
+        if value is not previous or previous_encoded is None:
+            previous = value
+            previous_encoded = encode_record(value)
+        encoded.append(previous_encoded)
+    return encoded
+
+def encode_columnar_batch(batch):
+    """Encode the rows of a ColumnarBatch as JSON objects, without building a dict per row."""
+    keys = [encode_record(name) + b":" for name in batch.names]
+    columns = [encode_column(column) for column in batch.columns]
+    for values in zip(*columns):
+        yield b"{" + b",".join(map(bytes.__add__, keys, values)) + b"}"
+
+def build_payloads(records):
+    """
+    Serialize and gzip a batch of records into request bodies for the Logs Ingestion API.
+    The batch is either a list of dicts or a ColumnarBatch.
+
+    Runs inside a worker process, so it only takes and returns picklable values. Returns a list of
+    (record_count, compressed_body) tuples, split so no uncompressed body exceeds MAX_PAYLOAD_BYTES.
+    """
+    payloads = []
+    chunk = []
+    chunk_size = 2  # enclosing brackets
+
+    if isinstance(records, ColumnarBatch):
+        encoded_records = encode_columnar_batch(records)
+    else:
+        encoded_records = map(encode_record, records)
+
+    for encoded in encoded_records:
+        if chunk and chunk_size + len(encoded) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append(compress_chunk(chunk))
+            chunk = []
+            chunk_size = 2
+        chunk.append(encoded)
+        chunk_size += len(encoded) + 1
+
+    if chunk:
+        payloads.append(compress_chunk(chunk))
+    return payloads
+
+def compress_chunk(chunk):
+    body = b"[" + b",".join(chunk) + b"]"
+    return len(chunk), gzip.compress(body, compresslevel=6)
@@ -1,11 +1,38 @@
 import argparse
 
+from src.collector.sources import SOURCES
+from src.utils.memory_budget import parse_size
+
+def parse_sources(value):
+    # Keep the given order, but never collect a source twice
+    sources = list(dict.fromkeys(source.strip() for source in value.split(",") if source.strip()))
+    if not sources:
+        raise argparse.ArgumentTypeError(f"No sources given, choose from: {', '.join(SOURCES)}")
+    unknown = [source for source in sources if source not in SOURCES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown sources: {unknown}, choose from: {', '.join(SOURCES)}")
+    return sources
+
+def parse_positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number: {value}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"Number must be positive: {value}")
+    return number
+
 def parse_args():
     parser = argparse.ArgumentParser(description="A tool to collect Kubernetes data and push it to a Log Analytics workspace in Azure")
+    parser.add_argument("command", nargs="?", choices=["collect", "list-sources"], default="collect", help="Collect data (default) or list the available sources")
+    parser.add_argument("--sources", type=parse_sources, help="Comma-separated sources to collect, see list-sources (default: all)")
     parser.add_argument("--since_seconds", type=int, help="Fetch logs since these many seconds ago (default: 86400)")
     parser.add_argument("--workspace_name", type=str, help="Name of the Log Analytics workspace (default: 'KubeForenSys-LAW')")
     parser.add_argument("--dce_name", type=str, help="Name of the Data Collection Endpoint (default: 'Kube-DCE')")
     parser.add_argument("--location", type=str, help="Azure region (default: 'west-europe')")
+    parser.add_argument("--columnar", action="store_true", default=None, help="Hand log and command history records to the uploader as columnar batches instead of one dict per record")
+    parser.add_argument("--serialization_workers", type=parse_positive_int, help="Number of processes serializing and compressing batches before upload (default: available CPUs, at most 4)")
+    parser.add_argument("--max_memory", type=parse_size, help="Maximum memory used by collected records buffered in collectors, batches and the upload queue, e.g. 512M (default: unlimited)")
 
     args = parser.parse_args()
 
@@ -0,0 +1,91 @@
+import argparse
+import threading
+
+SIZE_UNITS = {
+    "": 1,
+    "K": 1024,
+    "M": 1024 ** 2,
+    "G": 1024 ** 3,
+}
+
+# Rough per-object overhead of Python containers and scalars, in bytes
+OBJECT_OVERHEAD = 56
+
+def parse_size(value):
+    """Parse a size such as 512M or 2G into a number of bytes."""
+    value = value.strip().upper().removesuffix("B")
+    unit = value[-1:] if value[-1:] in SIZE_UNITS else ""
+    number = value[:-1] if unit else value
+    try:
+        size = int(float(number) * SIZE_UNITS[unit])
+    except (ValueError, OverflowError):
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}, expected e.g. 512M or 2G")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"Size must be positive: {value}")
+    return size
+
+def estimate_size(value, seen=None):
+    """
+    Estimate the memory held by a record, without serializing it.
+
+    Containers whose id() is in seen are counted only once, so the labels and annotations shared by
+    the rows of a pod are counted once per batch. The caller keeps seen for as long as the batch lives,
+    and only passes objects the batch keeps alive, as a freed object's id() can be reused.
+    """
+    if isinstance(value, str):
+        return OBJECT_OVERHEAD + len(value)
+    if not isinstance(value, (dict, list, tuple)):
+        return OBJECT_OVERHEAD
+
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 8  # another reference to an object which is already counted
+    seen.add(id(value))
+
+    if isinstance(value, dict):
+        return OBJECT_OVERHEAD + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    return OBJECT_OVERHEAD + sum(estimate_size(item, seen) for item in value)
+
+class MemoryBudget:
+    """
+    Tracks the bytes buffered across collectors, batches and upload queues against a maximum.
+
+    Producers reserve bytes before buffering data and release them once the data has been uploaded.
+    When a reservation does not fit, the caller is expected to drain its buffers before reserving again.
+    Without a maximum, every reservation fits.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    @property
+    def limited(self):
+        return self.max_bytes is not None
+
+    @property
+    def exceeded(self):
+        return self.limited and self.used > self.max_bytes
+
+    def try_acquire(self, size):
+        with self.lock:
+            if self.max_bytes is not None and self.used and self.used + size > self.max_bytes:
+                return False
+            self.reserve(size)
+            return True
+
+    def force_acquire(self, size):
+        # Used when nothing is left to drain, a single item larger than the budget must still pass
+        with self.lock:
+            self.reserve(size)
+
+    def reserve(self, size):
+        self.used += size
+        self.peak = max(self.peak, self.used)
+
+    def release(self, size):
+        with self.lock:
+            self.used = max(0, self.used - size)
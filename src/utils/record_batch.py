@@ -0,0 +1,78 @@
+from src.utils.memory_budget import OBJECT_OVERHEAD, MemoryBudget, estimate_size
+from src.utils.table_schemas import get_table_columns
+
+class ColumnarBatch:
+    """
+    A batch of records for a single table, stored as one list per column instead of one dict per row.
+
+    Values are appended positionally in the order of the table's schema, so no per-row dict is built.
+    Values shared between rows, such as the labels of a pod, are stored by reference.
+    """
+
+    def __init__(self, columns):
+        self.names = [column["name"] for column in columns]
+        self.columns = [[] for _ in columns]
+        # Bytes reserved with the memory budget for this batch, released once it is uploaded
+        self.reserved = 0
+
+    @classmethod
+    def for_table(cls, table_name):
+        return cls(get_table_columns(table_name))
+
+    def append(self, *values):
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values, got {len(values)}")
+        for column, value in zip(self.columns, values):
+            column.append(value)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+class RecordBuffer:
+    """
+    Collects the records of a collector and hands them out in the representation the sinks expect.
+
+    In row mode every record is handed out as a dict straight away. In columnar mode records are
+    appended to a ColumnarBatch, which is handed out once it holds batch_size records. Each appended
+    row reserves its size from the memory budget; when the budget is exhausted the batch is handed
+    out early, so the uploader can drain its queue before the collector continues.
+    """
+
+    def __init__(self, table_name, columnar=False, batch_size=500, memory_budget=None):
+        self.table_name = table_name
+        self.columnar = columnar
+        self.batch_size = batch_size
+        self.memory_budget = memory_budget or MemoryBudget()
+        self.names = [column["name"] for column in get_table_columns(table_name)]
+        self.new_batch()
+
+    def new_batch(self):
+        self.batch = ColumnarBatch.for_table(self.table_name) if self.columnar else None
+        # ids of the objects already counted for the open batch, see estimate_size
+        self.batch_seen = set()
+
+    def add(self, *values):
+        if not self.columnar:
+            return (dict(zip(self.names, values)),)
+
+        full = False
+        if self.memory_budget.limited:
+            # Count the values, not the values tuple: only objects kept alive by the batch may be memoized by id()
+            size = OBJECT_OVERHEAD + sum(estimate_size(value, self.batch_seen) for value in values)
+            if not self.memory_budget.try_acquire(size):
+                # Keep the row, but hand out the batch so the uploader frees memory first
+                self.memory_budget.force_acquire(size)
+                full = True
+            self.batch.reserved += size
+
+        self.batch.append(*values)
+        if full or len(self.batch) >= self.batch_size:
+            return self.flush()
+        return ()
+
+    def flush(self):
+        if not self.columnar or not len(self.batch):
+            return ()
+        batch = self.batch
+        self.new_batch()
+        return (batch,)
@@ -0,0 +1,121 @@
+# Schemas of the custom tables created in the Log Analytics workspace, one entry per data source
+TABLES = [
+    {
+        "name": "kubelogs_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "message", "type": "String"},
+            {"name": "container_name", "type": "String"},
+            {"name": "namespace", "type": "String"},
+            {"name": "pod_name", "type": "String"},
+            {"name": "containerimages", "type": "String"},
+            {"name": "labels", "type": "String"},
+            {"name": "annotations", "type": "String"}
+        ]
+    },
+    {
+        "name": "kubeevents_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "action", "type": "String"},
+            {"name": "first_timestamp", "type": "DateTime"},
+            {"name": "involved_object_name", "type": "String"},
+            {"name": "involved_object_uid", "type": "String"},
+            {"name": "last_timestamp", "type": "DateTime"},
+            {"name": "message", "type": "String"},
+            {"name": "reason", "type": "String"},
+            {"name": "reporting_component", "type": "String"}
+        ]
+    },
+    {
+        "name": "commandhistory_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "namespace", "type": "String"},
+            {"name": "pod_name", "type": "String"},
+            {"name": "container_name", "type": "String"},
+            {"name": "command", "type": "String"}
+        ]
+    },
+    {
+        "name": "serviceaccounts_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "namespace", "type": "String"},
+            {"name": "name", "type": "String"},
+            {"name": "automount_service_account_token", "type": "String"},
+            {"name": "image_pull_secrets", "type": "String"}
+        ]
+    },
+    {
+        "name": "suspiciouspods_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "namespace", "type": "String"},
+            {"name": "pod_name", "type": "String"},
+            {"name": "issue_type", "type": "String"},
+            {"name": "details", "type": "String"}
+        ]
+    },
+    {
+        "name": "rbacbindings_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "binding_type", "type": "String"},
+            {"name": "binding_name", "type": "String"},
+            {"name": "namespace", "type": "String"},
+            {"name": "subject_kind", "type": "String"},
+            {"name": "subject_name", "type": "String"},
+            {"name": "subject_namespace", "type": "String"},
+            {"name": "role_ref_kind", "type": "String"},
+            {"name": "role_ref_name", "type": "String"}
+        ]
+    },
+    {
+        "name": "rbacpermissions_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "subject_kind", "type": "String"},
+            {"name": "subject_name", "type": "String"},
+            {"name": "subject_namespace", "type": "String"},
+            {"name": "via_group", "type": "String"},
+            {"name": "scope", "type": "String"},
+            {"name": "namespace", "type": "String"},
+            {"name": "binding_type", "type": "String"},
+            {"name": "binding_name", "type": "String"},
+            {"name": "role_ref_kind", "type": "String"},
+            {"name": "role_ref_name", "type": "String"},
+            {"name": "api_groups", "type": "Dynamic"},
+            {"name": "resources", "type": "Dynamic"},
+            {"name": "verbs", "type": "Dynamic"},
+            {"name": "resource_names", "type": "Dynamic"},
+            {"name": "non_resource_urls", "type": "Dynamic"}
+        ]
+    },
+    {
+        "name": "cronjobs_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "cronjob_name", "type": "String"},
+            {"name": "namespace", "type": "String"},
+            {"name": "container_name", "type": "String"},
+            {"name": "image", "type": "String"},
+            {"name": "command", "type": "String"},
+            {"name": "schedule", "type": "String"}
+        ]
+    },
+    {
+        "name": "networkpolicies_CL",
+        "columns": [
+            {"name": "TimeGenerated", "type": "DateTime"},
+            {"name": "namespace", "type": "String"},
+            {"name": "name", "type": "String"}
+        ]
+    }
+]
+
+def get_table_columns(table_name):
+    for table in TABLES:
+        if table["name"] == table_name:
+            return table["columns"]
+    raise KeyError(f"Unknown table: {table_name}")
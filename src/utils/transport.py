@@ -0,0 +1,78 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from azure.core.credentials import AccessToken
+from azure.core.pipeline.transport import RequestsTransport
+from azure.identity import DefaultAzureCredential
+
+ARM_SCOPE = "https://management.azure.com/.default"
+
+# Tokens are renewed this many seconds before they expire, so a request never goes out with an expired token
+TOKEN_REFRESH_MARGIN = 300
+# All HTTP calls are made one after another from the main thread, so a small pool of kept-alive connections suffices
+POOL_SIZE = 10
+
+_lock = threading.Lock()
+_credential = None
+_session = None
+
+class CachedCredential:
+    """Wraps a token credential so every client shares one token per scope, renewed before it expires."""
+
+    def __init__(self, credential):
+        self.credential = credential
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        # A claims challenge asks for a fresh token, never answer it from the cache
+        if claims:
+            return self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+
+        key = (scopes, tenant_id)
+        with self.lock:
+            token = self.tokens.get(key)
+            if token is None or token.expires_on - time.time() < TOKEN_REFRESH_MARGIN:
+                token = self.credential.get_token(*scopes, tenant_id=tenant_id, **kwargs)
+                self.tokens[key] = AccessToken(token.token, token.expires_on)
+            return self.tokens[key]
+
+    def close(self):
+        self.credential.close()
+
+class BearerTokenAuth(requests.auth.AuthBase):
+    """Sets a bearer token from the shared credential on every request made through a requests session."""
+
+    def __init__(self, credential, scope=ARM_SCOPE):
+        self.credential = credential
+        self.scope = scope
+
+    def __call__(self, request):
+        request.headers["Authorization"] = f"Bearer {self.credential.get_token(self.scope).token}"
+        return request
+
+def get_credential():
+    global _credential
+    with _lock:
+        if _credential is None:
+            _credential = CachedCredential(DefaultAzureCredential())
+        return _credential
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            # Retries are left to the Azure SDK pipelines and tenacity, as with the SDK's own sessions
+            retries = Retry(total=False, redirect=False, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retries)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def get_azure_transport():
+    # Azure SDK clients share the keep-alive session, closing a client must not close it
+    return RequestsTransport(session=get_session(), session_owner=False)
@@ -0,0 +1,86 @@
+import gzip
+import io
+import json
+
+import pytest
+
+pytest.importorskip("azure.monitor.ingestion")
+pytest.importorskip("azure.identity")
+
+import requests
+from urllib3 import HTTPResponse
+from azure.core.credentials import AccessToken
+from azure.core.pipeline.transport import RequestsTransport
+
+from src.platform.azure.upload import azure_connector
+from src.platform.azure.upload.azure_connector import AzureConnector
+from src.utils.memory_budget import MemoryBudget
+from src.utils.record_batch import RecordBuffer
+
+class RecordingAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with 204 No Content and keeps the requests that were sent, with their body."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        body = request.body.read() if hasattr(request.body, "read") else request.body
+        self.requests.append((request, body))
+        response = requests.Response()
+        response.status_code = 204
+        response.request = request
+        response.url = request.url
+        response.raw = HTTPResponse(body=io.BytesIO(b""), status=204, preload_content=False)
+        return response
+
+    def close(self):
+        pass
+
+class StaticCredential:
+    def get_token(self, *scopes, **kwargs):
+        return AccessToken("token", 4102444800)
+
+@pytest.fixture
+def adapter(monkeypatch):
+    adapter = RecordingAdapter()
+    session = requests.Session()
+    session.mount("https://", adapter)
+    monkeypatch.setattr(azure_connector, "get_credential", StaticCredential)
+    monkeypatch.setattr(azure_connector, "get_azure_transport", lambda: RequestsTransport(session=session, session_owner=False))
+    return adapter
+
+def test_upload_sends_prebuilt_gzip_payloads(adapter):
+    connector = AzureConnector(endpoint_uri="https://kube-dce.westeurope-1.ingest.monitor.azure.com", serialization_workers=1)
+    records = [{"TimeGenerated": "2025-01-01T00:00:00Z", "message": f"line {i}"} for i in range(1200)]
+
+    connector.upload_in_batches(lambda: iter(records), stream_name="Custom-kubelogs_CL", dcr_stream_id="dcr-123")
+
+    assert len(adapter.requests) == 3
+    uploaded = []
+    for request, body in adapter.requests:
+        assert "/dataCollectionRules/dcr-123/streams/Custom-kubelogs_CL" in request.url
+        assert request.headers["Content-Encoding"] == "gzip"
+        uploaded.extend(json.loads(gzip.decompress(body)))
+    assert uploaded == records
+
+def test_columnar_upload_stays_within_the_memory_budget(adapter):
+    budget = MemoryBudget(max_bytes=20000)
+    connector = AzureConnector(
+        endpoint_uri="https://kube-dce.westeurope-1.ingest.monitor.azure.com",
+        serialization_workers=1,
+        memory_budget=budget
+    )
+
+    def collect():
+        records = RecordBuffer("commandhistory_CL", columnar=True, memory_budget=budget)
+        for i in range(2000):
+            yield from records.add("2025-01-01T00:00:00Z", "ns", "pod", "container", f"command {i}")
+        yield from records.flush()
+
+    connector.upload_in_batches(collect, stream_name="Custom-commandhistory_CL", dcr_stream_id="dcr-123")
+
+    uploaded = [row for _, body in adapter.requests for row in json.loads(gzip.decompress(body))]
+    assert [row["command"] for row in uploaded] == [f"command {i}" for i in range(2000)]
+    assert budget.peak <= budget.max_bytes + 1000
+    assert budget.used == 0
@@ -0,0 +1,49 @@
+import argparse
+
+import pytest
+
+from src.utils.memory_budget import MemoryBudget, estimate_size, parse_size
+from src.utils.record_batch import RecordBuffer
+
+def test_parse_size():
+    assert parse_size("512M") == 512 * 1024 ** 2
+    assert parse_size("2g") == 2 * 1024 ** 3
+    for value in ["0", "-1M", "inf", "1e400", "nan", "lots"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_size(value)
+
+def test_shared_objects_are_counted_once_per_batch():
+    labels = {f"label{i}": "value" * 10 for i in range(10)}
+    seen = set()
+    first = estimate_size({"message": "a", "labels": labels}, seen)
+    second = estimate_size({"message": "b", "labels": labels}, seen)
+    assert second < first - estimate_size(labels)
+
+def add_rows(records, count):
+    batches = []
+    for i in range(count):
+        batches.extend(records.add("2025-01-01T00:00:00Z", "ns", "pod", "container", f"command {i}"))
+    return batches
+
+def test_columnar_rows_reserve_from_the_budget_and_flush_early():
+    budget = MemoryBudget(max_bytes=5000)
+    records = RecordBuffer("commandhistory_CL", columnar=True, batch_size=500, memory_budget=budget)
+
+    batches = add_rows(records, 100)
+
+    assert batches, "the batch must be handed out before it reaches batch_size"
+    first = batches[0]
+    assert len(first) < 500
+    # The row whose reservation failed is kept, so the budget is exceeded by at most one row
+    row_size = first.reserved / len(first)
+    assert budget.max_bytes < first.reserved <= budget.max_bytes + 2 * row_size
+    assert budget.used == sum(batch.reserved for batch in batches) + records.batch.reserved
+
+def test_columnar_rows_reserve_nothing_without_a_limit():
+    budget = MemoryBudget()
+    records = RecordBuffer("commandhistory_CL", columnar=True, batch_size=50, memory_budget=budget)
+
+    batches = add_rows(records, 100)
+
+    assert [len(batch) for batch in batches] == [50, 50]
+    assert budget.used == 0
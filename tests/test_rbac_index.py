@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from src.collector.rbac_index import RbacIndex
+
+def metadata(name, namespace=None, labels=None):
+    return SimpleNamespace(name=name, namespace=namespace, labels=labels, creation_timestamp=None)
+
+def rule(resources, verbs):
+    return SimpleNamespace(api_groups=[""], resources=resources, verbs=verbs, resource_names=None, non_resource_ur_ls=None)
+
+def binding(name, role_kind, role_name, subjects, namespace=None):
+    return SimpleNamespace(
+        metadata=metadata(name, namespace),
+        role_ref=SimpleNamespace(kind=role_kind, name=role_name),
+        subjects=subjects
+    )
+
+def subject(kind, name, namespace=None):
+    return SimpleNamespace(kind=kind, name=name, namespace=namespace)
+
+def build_index():
+    secret_reader = SimpleNamespace(
+        metadata=metadata("secret-reader", labels={"aggregate-to-readers": "true"}),
+        rules=[rule(["secrets"], ["get"])],
+        aggregation_rule=None
+    )
+    readers = SimpleNamespace(
+        metadata=metadata("readers"),
+        rules=None,
+        aggregation_rule=SimpleNamespace(cluster_role_selectors=[
+            SimpleNamespace(match_labels={"aggregate-to-readers": "true"}, match_expressions=None)
+        ])
+    )
+    pod_reader = SimpleNamespace(metadata=metadata("pod-reader", "ns1"), rules=[rule(["pods"], ["get"])])
+
+    return RbacIndex(
+        roles=[pod_reader],
+        cluster_roles=[secret_reader, readers],
+        role_bindings=[binding("read-pods", "Role", "pod-reader", [subject("ServiceAccount", "sa1", "ns1")], namespace="ns1")],
+        cluster_role_bindings=[binding("all-sa-readers", "ClusterRole", "readers", [subject("Group", "system:serviceaccounts")])],
+        service_accounts=[SimpleNamespace(metadata=metadata("sa2", "ns2"))]
+    )
+
+def permissions_of(index, name):
+    return {
+        (tuple(p["resources"]), p["scope"], p["via_group"])
+        for p in index.effective_permissions()
+        if p["subject_kind"] == "ServiceAccount" and p["subject_name"] == name
+    }
+
+def test_aggregated_cluster_role_rules_are_resolved():
+    assert [r.resources for r in build_index().cluster_role_rules["readers"]] == [["secrets"]]
+
+def test_service_accounts_inherit_grants_of_implicit_groups():
+    index = build_index()
+
+    assert permissions_of(index, "sa1") == {
+        (("pods",), "Namespace", ""),
+        (("secrets",), "Cluster", "system:serviceaccounts"),
+    }
+    # Service accounts without a binding of their own still inherit the group grants
+    assert permissions_of(index, "sa2") == {(("secrets",), "Cluster", "system:serviceaccounts")}